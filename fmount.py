@@ -1,58 +1,282 @@
 from typing import Generator
-import os, time, logging
+import ctypes
+import time, logging
 from pathlib import Path
 
+try:
+    import win32con, win32gui
+except ImportError:  # pywin32 absent : on retombe sur le polling
+    win32gui = None
+
+logger = logging.getLogger(__name__)
+
+_GetLogicalDrives = ctypes.windll.kernel32.GetLogicalDrives
+_GetDriveTypeW = ctypes.windll.kernel32.GetDriveTypeW
+_GetDriveTypeW.argtypes = (ctypes.c_wchar_p,)
+_GetVolumeInformationW = ctypes.windll.kernel32.GetVolumeInformationW
+_GetVolumeInformationW.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_uint32,
+                                   ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+                                   ctypes.c_wchar_p, ctypes.c_uint32)
+
+# restype explicite : HDEVNOTIFY est un pointeur, le c_int par défaut le tronquerait en 64 bits
+_RegisterDeviceNotificationW = ctypes.windll.user32.RegisterDeviceNotificationW
+_RegisterDeviceNotificationW.argtypes = (ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32)
+_RegisterDeviceNotificationW.restype = ctypes.c_void_p
+_UnregisterDeviceNotification = ctypes.windll.user32.UnregisterDeviceNotification
+_UnregisterDeviceNotification.argtypes = (ctypes.c_void_p,)
+
+# Types de lecteurs (GetDriveTypeW) dignes d'intérêt : les CD/DVD vides ou
+# inconnus peuvent bloquer plusieurs secondes sur un simple stat
+DRIVE_REMOVABLE = 2
+DRIVE_FIXED = 3
+DRIVE_REMOTE = 4
+_WANTED_DRIVE_TYPES = (DRIVE_REMOVABLE, DRIVE_FIXED, DRIVE_REMOTE)
+
+# Constantes WM_DEVICECHANGE (non exposées par win32con)
+DBT_DEVICEARRIVAL = 0x8000
+DBT_DEVICEREMOVECOMPLETE = 0x8004
+DBT_DEVTYP_VOLUME = 0x00000002
+DBT_DEVTYP_DEVICEINTERFACE = 0x00000005
+DEVICE_NOTIFY_WINDOW_HANDLE = 0x00000000
+
+
+class _DEV_BROADCAST_VOLUME(ctypes.Structure):
+    _fields_ = [
+        ("dbcv_size", ctypes.c_uint32),
+        ("dbcv_devicetype", ctypes.c_uint32),
+        ("dbcv_reserved", ctypes.c_uint32),
+        ("dbcv_unitmask", ctypes.c_uint32),
+        ("dbcv_flags", ctypes.c_uint16),
+    ]
+
+
+class _GUID(ctypes.Structure):
+    _fields_ = [
+        ("data1", ctypes.c_uint32),
+        ("data2", ctypes.c_uint16),
+        ("data3", ctypes.c_uint16),
+        ("data4", ctypes.c_ubyte * 8),
+    ]
+
+
+class _DEV_BROADCAST_DEVICEINTERFACE(ctypes.Structure):
+    _fields_ = [
+        ("dbcc_size", ctypes.c_uint32),
+        ("dbcc_devicetype", ctypes.c_uint32),
+        ("dbcc_reserved", ctypes.c_uint32),
+        ("dbcc_classguid", _GUID),
+        ("dbcc_name", ctypes.c_wchar * 1),
+    ]
+
+
+# {53f5630d-b6bf-11d0-94f2-00a0c91efb8b}
+GUID_DEVINTERFACE_VOLUME = _GUID(0x53f5630d, 0xb6bf, 0x11d0,
+                                 (ctypes.c_ubyte * 8)(0x94, 0xf2, 0x00, 0xa0, 0xc9, 0x1e, 0xfb, 0x8b))
+
+
+class _WindowsDeviceNotifier:
+    '''
+    Fenêtre cachée qui reçoit les notifications WM_DEVICECHANGE de Windows.
+     - Sur arrivée/retrait d'un volume, appelle on_change(lettres, arrivée) avec les
+       racines de lecteurs décodées de dbcv_unitmask (ou None si l'événement n'en porte pas).
+    '''
+    def __init__(self, on_change:callable):
+        self.on_change = on_change
+        wc = win32gui.WNDCLASS()
+        wc.lpszClassName = "FmountDeviceNotifier"
+        wc.hInstance = win32gui.GetModuleHandle(None)
+        wc.lpfnWndProc = {win32con.WM_DEVICECHANGE: self._on_device_change,
+                          win32con.WM_CLOSE: self._on_close}
+        class_atom = win32gui.RegisterClass(wc)
+        self.hwnd = win32gui.CreateWindow(class_atom, "FmountDeviceNotifier", 0,
+                                          0, 0, 0, 0, 0, 0, wc.hInstance, None)
+        # Ne s'abonner qu'aux volumes : les souris, claviers, yubikeys... ne nous réveillent pas
+        notification_filter = _DEV_BROADCAST_DEVICEINTERFACE(
+            ctypes.sizeof(_DEV_BROADCAST_DEVICEINTERFACE),
+            DBT_DEVTYP_DEVICEINTERFACE, 0, GUID_DEVINTERFACE_VOLUME)
+        self._hnotify = _RegisterDeviceNotificationW(
+            self.hwnd, ctypes.byref(notification_filter),
+            DEVICE_NOTIFY_WINDOW_HANDLE)
+        if not self._hnotify:
+            logger.warning("RegisterDeviceNotificationW failed: volume filter not active")
+
+    @staticmethod
+    def _unitmask_to_drives(unitmask:int)->list:
+        '''Décode le champ dbcv_unitmask (bit 0 = A:, bit 1 = B:, ...) en racines de lecteurs.'''
+        return [f"{chr(ord('a') + bit)}:\\" for bit in range(26) if unitmask & (1 << bit)]
+
+    def _on_device_change(self, hwnd, msg, wparam, lparam):
+        if wparam in (DBT_DEVICEARRIVAL, DBT_DEVICEREMOVECOMPLETE) and lparam:
+            header = _DEV_BROADCAST_VOLUME.from_address(lparam)
+            if header.dbcv_devicetype == DBT_DEVTYP_VOLUME:
+                self.on_change(self._unitmask_to_drives(header.dbcv_unitmask),
+                               wparam == DBT_DEVICEARRIVAL)
+            elif header.dbcv_devicetype == DBT_DEVTYP_DEVICEINTERFACE:
+                self.on_change(None, wparam == DBT_DEVICEARRIVAL)
+        return True
+
+    def _on_close(self, hwnd, msg, wparam, lparam):
+        if self._hnotify:
+            _UnregisterDeviceNotification(self._hnotify)
+            self._hnotify = None
+        win32gui.DestroyWindow(hwnd)
+        win32gui.PostQuitMessage(0)
+        return 0
+
+    def pump(self):
+        '''Boucle de messages bloquante (jusqu'à close()).'''
+        win32gui.PumpMessages()
+
+    def close(self):
+        # PostMessage est utilisable depuis un autre thread (ex : menu pystray)
+        win32gui.PostMessage(self.hwnd, win32con.WM_CLOSE, 0, 0)
+
+
 class Fmount:
     '''
     Un detecteur de montage de volumes sur Windows (et potentiellement d'autres OS à l'avenir).
      - Il détecte les nouveaux lecteurs installés depuis la dernière vérification.
         - Il peut exécuter une fonction de rappel pour chaque nouveau lecteur détecté.
     '''
+
+    idle_ticks_before_backoff = 30  # Nombre de ticks sans changement avant de ralentir le polling
+    max_delay = 30.0  # Intervalle de polling maximum en secondes
+
     def __init__(self):
-        self.drives = list(self.find_drives())
-        logging.info(f"Initial drives detected: {self.drives}")
+        self._mask = _GetLogicalDrives()
+        self._types = self._drive_types(self._mask)
+        self.drives = set(self.find_drives())
+        logger.info("Initial drives detected: %s", self.drives)
         self.run = True
+        self._notifier = None
+
+    @staticmethod
+    def _drive_types(mask:int)->dict:
+        '''
+        Type GetDriveTypeW de chaque racine de lecteur du bitmask (bit 0 = A:, ...).
+        Recalculé uniquement quand le masque change : le type d'une lettre est stable.
+        '''
+        types = {}
+        while mask:
+            bit = mask & -mask
+            drive = f"{chr(ord('a') + bit.bit_length() - 1)}:\\"
+            types[drive] = _GetDriveTypeW(drive)
+            mask ^= bit
+        return types
+
+    @staticmethod
+    def _has_media(drive:str)->bool:
+        '''
+        Vrai si un volume est monté sur la racine (lecteur de cartes avec média).
+        GetVolumeInformationW répond immédiatement pour un lecteur vide, là où un stat
+        peut bloquer plusieurs secondes en attendant le média.
+        '''
+        return bool(_GetVolumeInformationW(drive, None, 0, None, None, None, None, 0))
 
-    def find_drives(self)-> Generator[Path, None, None]:
-        for drive in os.listdrives():
-            p_drive = Path(drive)
-            if p_drive.is_dir():
-                yield p_drive
-    
-    def detect_new_drives(self, callback:callable=None):
+    def find_drives(self)-> Generator[str, None, None]:
+        '''
+        Enumère les racines de lecteurs ("c:\\\\", ...) exploitables.
+        Des chaînes plutôt que des Path : comparaison et hachage natifs, zéro allocation
+        au repos ; le callback reçoit un Path construit au moment de l'appel.
+        Une lettre amovible (lecteur de cartes) n'est retenue que si un média est présent :
+        sa lettre reste dans le bitmask même à vide.
+        '''
+        for drive, drive_type in self._types.items():
+            if drive_type == DRIVE_REMOVABLE:
+                if self._has_media(drive):
+                    yield drive
+            elif drive_type in _WANTED_DRIVE_TYPES:
+                yield drive
+
+    def _on_device_event(self, letters:list, arrival:bool, callback:callable=None):
+        '''
+        Traite une notification WM_DEVICECHANGE.
+        L'insertion d'un média dans un lecteur déjà monté (carte SD dans un lecteur de
+        cartes) ne change pas le bitmask GetLogicalDrives : les lettres décodées de
+        l'événement sont donc dispatchées directement, sans comparaison de masque.
+        '''
+        if letters is None:
+            self._mask = None  # Force une comparaison complète
+            self.detect_new_drives(callback=callback)
+            return
+        if arrival:
+            for drive in letters:
+                if drive not in self.drives:
+                    self.drives.add(drive)
+                    logger.info("New drive detected: %s", drive)
+                    if callback:
+                        logger.info("Executing callback for drive: %s", drive)
+                        callback(Path(drive))  # Promotion en Path uniquement à l'appel
+        else:
+            for drive in letters:
+                if drive in self.drives:
+                    self.drives.discard(drive)
+                    logger.info("Drive removed: %s", drive)
+        # Resynchronise l'état du polling
+        self._mask = _GetLogicalDrives()
+        self._types = self._drive_types(self._mask)
+
+    def detect_new_drives(self, callback:callable=None)->bool:
         '''
         Detection des nouveaux lecteurs installés depuis la dernière vérification.
+        Renvoie True si la liste des lecteurs a changé.
         '''
-        _drives = []
-        # Ajouter les nouveaux lecteurs détectés et exécuter le callback pour chaque nouveau lecteur
-        for drive in self.find_drives():
-            if drive not in self.drives:
-                logging.info(f"New drive detected: {drive}")
-                self.drives.append(drive)
-                if callback:
-                    logging.info(f"Executing callback for drive: {drive}")
-                    callback(drive)
-            _drives.append(drive)
-        # Supprimer les lecteurs qui ne sont plus présents
-        for drive in self.drives:
-            if drive not in _drives:
-                logging.info(f"Drive removed: {drive}")
-                self.drives.remove(drive)
-
-    def scan(self, callback:callable=None, delay:float=1.0):
+        mask = _GetLogicalDrives()
+        if mask != self._mask:
+            self._mask = mask
+            self._types = self._drive_types(mask)
+        elif DRIVE_REMOVABLE not in self._types.values():
+            return False  # Pas de lecteur amovible : le bitmask suffit comme état
+        current = set(self.find_drives())
+        if current == self.drives:
+            return False
+        # Exécuter le callback pour chaque nouveau lecteur détecté
+        for drive in current - self.drives:
+            logger.info("New drive detected: %s", drive)
+            if callback:
+                logger.info("Executing callback for drive: %s", drive)
+                callback(Path(drive))  # Promotion en Path uniquement à l'appel
+        for drive in self.drives - current:
+            logger.info("Drive removed: %s", drive)
+        self.drives = current
+        return True
+
+    def scan(self, callback:callable=None, delay:float=1.0, use_events:bool=True):
         '''
         Scan des lecteurs montés et exécution du callback pour chaque lecteur détecté.
+         - Si pywin32 est disponible, s'abonne aux notifications WM_DEVICECHANGE
+           (CPU nul au repos, détection quasi immédiate) ;
+         - sinon retombe sur un polling toutes les delay secondes, avec un intervalle
+           qui double progressivement (plafonné à max_delay) quand rien ne change.
         '''
-        while self.run:
-            self.detect_new_drives(callback=callback)
-            time.sleep(delay)
-        logging.info("Stopped scanning for new drives.")
-        
+        if use_events and win32gui is not None:
+            logger.info("Scanning drives via WM_DEVICECHANGE notifications.")
+            self._notifier = _WindowsDeviceNotifier(
+                lambda letters, arrival: self._on_device_event(letters, arrival, callback))
+            self._notifier.pump()
+        else:
+            self._interval = delay
+            self._idle_ticks = 0
+            while self.run:
+                if self.detect_new_drives(callback=callback):
+                    # Activité récente : revenir à la cadence nominale
+                    self._interval = delay
+                    self._idle_ticks = 0
+                else:
+                    self._idle_ticks += 1
+                    if self._idle_ticks > self.idle_ticks_before_backoff:
+                        self._interval = min(self._interval * 2, self.max_delay)
+                time.sleep(self._interval)
+        logger.info("Stopped scanning for new drives.")
+
     def stop(self):
         '''
         Arrête le scan des lecteurs montés.
         '''
         self.run = False
+        if self._notifier is not None:
+            self._notifier.close()
+            self._notifier = None
 
 if __name__ == "__main__":
     from FUTIL.my_logging import *
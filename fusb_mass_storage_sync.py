@@ -2,17 +2,89 @@
 Ce module permet de synchoniqer les données d'un périphérique de stockage de masse USB avec un dossier local.
 Il utilise fmount.Fmount pour détecter les nouveaux lecteurs montés.
 '''
+import ctypes
+import hashlib
+import json
 import logging, time, os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-import configparser
-
-import pystray
-from PIL import Image
-import FreeSimpleGUI  as sg
-import dirsync
 
 from fmount import Fmount
 
+logger = logging.getLogger(__name__)
+
+sg = None  # FreeSimpleGUI, importé à la première utilisation (tire Tkinter : démarrage lent)
+
+
+def _import_sg(icon_path:str=None):
+    '''
+    Importe FreeSimpleGUI à la demande, le met en cache dans le module et le
+    configure (thème, icône) au premier import réel : l'import ne doit pas
+    se produire au démarrage mais au premier popup affiché.
+    '''
+    global sg
+    if sg is None:
+        import FreeSimpleGUI
+        sg = FreeSimpleGUI
+        sg.theme('dark grey 9')
+        if icon_path:
+            sg.set_options(icon=icon_path)
+    return sg
+
+# use_last_error : chaque thread ctypes capture son propre GetLastError, sinon les
+# workers de copie concurrents s'écrasent mutuellement le code d'erreur
+_kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+_CopyFileExW = _kernel32.CopyFileExW
+_CopyFileExW.argtypes = (ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p,
+                         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32)
+_CopyFileExW.restype = ctypes.c_int
+
+
+def _copy_file(src:str, dst:str):
+    '''
+    Copie un fichier via le noyau (CopyFileExW) : pas de boucle read/write Python,
+    timestamps et attributs préservés.
+    '''
+    if not _CopyFileExW(src, dst, None, None, None, 0):
+        raise ctypes.WinError(ctypes.get_last_error())
+
+
+# --- IoRing (Windows 11 21H2+) : lectures source soumises par lots ---------
+try:
+    _ioring = ctypes.WinDLL("api-ms-win-core-ioring-l1-1-0.dll")
+except OSError:
+    _ioring = None
+
+
+class _IORING_CREATE_FLAGS(ctypes.Structure):
+    _fields_ = [("required", ctypes.c_uint32), ("advisory", ctypes.c_uint32)]
+
+class _IORING_HANDLE_REF(ctypes.Structure):
+    _fields_ = [("kind", ctypes.c_uint32), ("handle", ctypes.c_void_p)]
+
+class _IORING_BUFFER_REF(ctypes.Structure):
+    _fields_ = [("kind", ctypes.c_uint32), ("address", ctypes.c_void_p)]
+
+class _IORING_CQE(ctypes.Structure):
+    _fields_ = [("user_data", ctypes.c_size_t),
+                ("result", ctypes.c_int32),
+                ("information", ctypes.c_size_t)]
+
+
+if _ioring is not None:
+    _ioring.CreateIoRing.argtypes = (ctypes.c_uint32, _IORING_CREATE_FLAGS,
+                                     ctypes.c_uint32, ctypes.c_uint32,
+                                     ctypes.POINTER(ctypes.c_void_p))
+    _ioring.BuildIoRingReadFile.argtypes = (ctypes.c_void_p, _IORING_HANDLE_REF,
+                                            _IORING_BUFFER_REF, ctypes.c_uint32,
+                                            ctypes.c_uint64, ctypes.c_size_t,
+                                            ctypes.c_uint32)
+    _ioring.SubmitIoRing.argtypes = (ctypes.c_void_p, ctypes.c_uint32,
+                                     ctypes.c_uint32, ctypes.POINTER(ctypes.c_uint32))
+    _ioring.PopIoRingCompletion.argtypes = (ctypes.c_void_p, ctypes.POINTER(_IORING_CQE))
+    _ioring.CloseIoRing.argtypes = (ctypes.c_void_p,)
+
 
 class FMassStorageSync:
     '''
@@ -22,16 +94,34 @@ class FMassStorageSync:
 
     default_sync_interval = 1.0  # Intervalle de scan des volumes montés par défaut en secondes
     default_icon_path = "icon.png"  # Chemin par défaut de l'icône de la barre des tâches
-    sleep_before_sync = 2.0  # Délai avant de synchroniser pour que notre popup se place devant l'explorateur de fichiers
     defaut_remote_path = 'DCIM'
+    copy_workers = 8  # Copies de fichiers simultanées (un stockage USB est limité par la latence par fichier, pas le débit)
+    ioring_chunk_size = 8 * 1024 * 1024  # Taille max d'une lecture IoRing (tient dans le c_uint32 de l'API)
+    ioring_byte_budget = 64 * 1024 * 1024  # Octets maximum en vol par lot IoRing
+    _icon_cache = {}  # Images d'icône décodées, clé (chemin, mtime)
 
     def __init__(self, ini_path:str='fusb_mass_storage_sync.ini'):
         self.ini_path = Path(ini_path)
-        self.config = self.read_ini()
+        self._batch_depth = 0
+        self._dirty = False
+        self.read_ini()
+        with self._batch_writes():
+            # Force l'écriture des valeurs par défaut manquantes en une seule passe
+            _ = (self.remote_path, self.icon_path, self.sync_interval)
         self.fmount = Fmount()
-        logging.info(f"FMassStorageSync initialized with local folder: {self.local_folder}")
+        self._pool = ThreadPoolExecutor(max_workers=2)  # Copies en tâche de fond (2 lecteurs simultanés max)
+        logger.info("FMassStorageSync initialized with local folder: %s", self.local_folder)
+        # Imports différés : pystray et PIL pèsent lourd au démarrage
+        # (FreeSimpleGUI, plus lourd encore, n'est chargé qu'au premier popup)
+        import pystray
+        from PIL import Image
         try:
-            image = Image.open(self.icon_path)
+            key = (self.icon_path, os.path.getmtime(self.icon_path))
+            image = self._icon_cache.get(key)
+            if image is None:
+                with Image.open(self.icon_path) as icon_file:
+                    image = icon_file.copy()  # copy() : l'image vit en mémoire, le fichier est refermé
+                self._icon_cache[key] = image
         except Exception:
             image = None
         self.icon = pystray.Icon("FMassStorageSync",
@@ -42,32 +132,52 @@ class FMassStorageSync:
                                      pystray.MenuItem("Paramètres", self.open_settings),
                                      pystray.MenuItem("Quitter", self.quit)
                                  ))
-        sg.theme('dark grey 9')
-        sg.set_options(icon=self.icon_path)
         self.icon.run_detached() # Démarre l'icône de la barre des tâches
         self.scan_drives()
 
     def read_ini(self):
-        config = configparser.ConfigParser()
+        '''
+        Charge la section [Settings] du fichier INI dans un dict.
+        configparser est inutilement coûteux pour une poignée de clés :
+        un parseur clé = valeur minimal suffit (format compatible).
+        Le mtime du fichier est mémorisé pour éviter de re-parser tant qu'il n'a pas changé.
+        '''
+        self._settings = {}
         if self.ini_path.exists():
-            config.read(self.ini_path)
-            if not config.has_section('Settings'):
-                config.add_section('Settings')
-            logging.info(f"INI file loaded from {self.ini_path}")
+            for line in self.ini_path.read_text().splitlines():
+                line = line.strip()
+                if '=' in line and not line.startswith((';', '#', '[')):
+                    key, value = line.split('=', 1)
+                    self._settings[key.strip()] = value.strip()
+            self._mtime = os.path.getmtime(self.ini_path)
+            logger.info("INI file loaded from %s", self.ini_path)
         else:
-            logging.warning(f"INI file not found at {self.ini_path}. Using default configuration.")
-        return config
+            self._mtime = None
+            logger.warning("INI file not found at %s. Using default configuration.", self.ini_path)
+
+    def refresh_ini(self):
+        '''
+        Relit le fichier INI uniquement s'il a été modifié depuis la dernière lecture.
+        '''
+        try:
+            mtime = os.path.getmtime(self.ini_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.read_ini()
 
     @property
     def local_folder(self):
-        return self.config.get('Settings', 'local_folder', fallback=None)
+        self.refresh_ini()
+        return self._settings.get('local_folder')
     @local_folder.setter
     def local_folder(self, value):
         self.set_settings('local_folder', value)
 
     @property
     def remote_path(self):
-        remote_path =  self.config.get('Settings', 'remote_path', fallback=None)
+        self.refresh_ini()
+        remote_path = self._settings.get('remote_path')
         if remote_path is None:
             remote_path = self.defaut_remote_path
             self.set_settings("remote_path", remote_path)
@@ -78,7 +188,8 @@ class FMassStorageSync:
 
     @property
     def icon_path(self):
-        icon_path = self.config.get('Settings', 'icon_path', fallback=None)
+        self.refresh_ini()
+        icon_path = self._settings.get('icon_path')
         if icon_path is None:
             icon_path = self.default_icon_path  # Définir la valeur par défaut si non définie
             self.set_settings('icon_path', str(icon_path))
@@ -89,21 +200,38 @@ class FMassStorageSync:
 
     @property
     def sync_interval(self):
-        sync_interval = self.config.getfloat('Settings', 'sync_interval', fallback=None)
+        self.refresh_ini()
+        sync_interval = self._settings.get('sync_interval')
         if sync_interval is None:
             sync_interval = self.default_sync_interval  # Définir la valeur par défaut si non définie
             self.set_settings('sync_interval', sync_interval) # Enregistrer la valeur par défaut dans le fichier INI
-        return sync_interval
+            return sync_interval
+        return float(sync_interval)
     @sync_interval.setter
     def sync_interval(self, value):
         self.set_settings('sync_interval', value)
 
+    @contextmanager
+    def _batch_writes(self):
+        '''
+        Diffère l'écriture du fichier INI : les set_settings dans le bloc ne font
+        qu'une seule écriture à la sortie (au lieu d'une par mutation).
+        '''
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self.write_ini()
+
     def set_settings(self, key:str, value):
         '''Met à jour la config
         '''
-        if not self.config.has_section('Settings'):
-            self.config.add_section('Settings')
-        self.config.set('Settings', key , str(value))
+        self._settings[key] = str(value)
+        if self._batch_depth:
+            self._dirty = True
+            return
         self.write_ini()
 
 
@@ -112,71 +240,324 @@ class FMassStorageSync:
         Enregistre la configuration dans un fichier INI.
         '''
         with open(self.ini_path, 'w') as configfile:
-            self.config.write(configfile)
-        logging.info(f"Configuration saved to INI file at {self.ini_path}")
+            configfile.write("[Settings]\n")
+            configfile.writelines(f"{key} = {value}\n" for key, value in self._settings.items())
+        self._mtime = os.path.getmtime(self.ini_path)  # Pour ne pas relire notre propre écriture
+        self._dirty = False
+        logger.info("Configuration saved to INI file at %s", self.ini_path)
 
     def scan_drives(self,*args, **kwargs):
         '''
         Scanne les lecteurs montés et synchronise les données avec le dossier local.
         '''
-        logging.debug(f"scan_drives called with args: {args}, kwargs: {kwargs}")
+        logger.debug("scan_drives called with args: %s, kwargs: %s", args, kwargs)
         self.fmount.scan(callback=self.ui_sync_drive, delay=self.sync_interval)
 
-    def ui_sync_drive(self, drive:Path, sleep_before_sync:float=None):
+    def _ask_local_folder(self):
+        '''
+        Demande le dossier cible via une fenêtre forcée au premier plan :
+        pas besoin d'attendre que l'explorateur Windows ait fini de s'ouvrir.
+        Renvoie le chemin choisi ou None si annulé.
+        '''
+        _import_sg(self.icon_path)
+        layout = [[sg.Text("Repertoire cible de synchronisation")],
+                  [sg.Input(default_text=self.local_folder or '', key='folder'), sg.FolderBrowse()],
+                  [sg.OK(), sg.Cancel()]]
+        window = sg.Window("FMassStorageSync", layout, keep_on_top=True, finalize=True)
+        window.TKroot.lift()
+        window.TKroot.attributes('-topmost', True)
+        try:
+            hwnd = int(window.TKroot.wm_frame(), 16)
+            ctypes.windll.user32.SetForegroundWindow(hwnd)
+        except Exception:
+            pass  # Pas bloquant : la fenêtre est déjà topmost
+        event, values = window.read()
+        window.close()
+        return values['folder'] if event == 'OK' and values else None
+
+    def ui_sync_drive(self, drive:Path):
         '''
         Synchronise les données du lecteur avec le dossier local.
         '''
-        time.sleep(sleep_before_sync if sleep_before_sync is not None else self.sleep_before_sync)  # Attendre un délai avant de synchroniser pour que notre popup se place devant l'explorateur de fichiers
-        filename = sg.popup_get_folder("Repertoire cible de synchronisation", default_path=self.local_folder)
-        if filename:
+        _import_sg(self.icon_path)
+        while True:
+            filename = self._ask_local_folder()
+            if not filename:
+                return  # Annulé par l'utilisateur
             local_path = Path(filename)
-            if local_path.is_dir() and local_path.exists():
-                logging.info(f"Selected local folder: {local_path}")
-                if filename != self.local_folder:
-                    self.local_folder = filename
-                    logging.info(f"Local folder updated to: {self.local_folder}")
-                self.sync_drive(drive)
-            else:
-                logging.warning(f"Selected path is not a valid directory: {local_path}")
-                sg.popup_error("Le chemin sélectionné n'est pas un répertoire valide. Veuillez sélectionner un dossier existant.")
-                self.ui_sync_drive(drive, 0.0)  # Relancer la sélection du dossier
+            if local_path.is_dir():
+                break
+            logger.warning("Selected path is not a valid directory: %s", local_path)
+            sg.popup_error("Le chemin sélectionné n'est pas un répertoire valide. Veuillez sélectionner un dossier existant.")
+        logger.info("Selected local folder: %s", local_path)
+        if filename != self.local_folder:
+            self.local_folder = filename
+            logger.info("Local folder updated to: %s", self.local_folder)
+        self.sync_drive(drive)
 
     def sync_drive(self, drive:Path):
         '''
         Synchronise les données du lecteur avec le dossier local.
         (Cette fonction doit être implémentée pour effectuer la synchronisation réelle des fichiers.)
         '''
-        logging.info(f"Synchronizing drive {drive} with local folder {self.local_folder}")
-        source = Path(drive) / self.remote_path
-        target = Path(self.local_folder)
-        result = dirsync.sync(sourcedir=source, targetdir=target, action='sync')
-        logging.info(f"result = {result}")
-        #TODO : sg.popup_animated
+        _import_sg(self.icon_path)
+        logger.info("Synchronizing drive %s with local folder %s", drive, self.local_folder)
+        # Chemins convertis en chaînes une fois pour toutes : les helpers travaillent
+        # sur les str de os.scandir, inutile de repasser par __fspath__ à chaque entrée
+        source = os.path.join(drive, self.remote_path)
+        target = str(self.local_folder)
+        manifest_path = self._manifest_path(drive, target)
+        manifest = self._load_manifest(manifest_path)
+        # La copie tourne dans un thread pour ne pas geler l'icône de la barre des tâches
+        future = self._pool.submit(self._ioring_mirror, source, target, manifest)
+        while not future.done():
+            sg.popup_animated(sg.DEFAULT_BASE64_LOADING_GIF,
+                              message="Synchronisation en cours...",
+                              time_between_frames=100)
+            time.sleep(0.1)
+        sg.popup_animated(None)  # Ferme le popup animé
+        try:
+            result = future.result()
+        except Exception as e:
+            # Fichier verrouillé, lecture USB défaillante... : on abandonne cette synchronisation
+            # (manifest non enregistré, pas de proposition d'effacement) sans tuer le scan
+            logger.exception("Synchronization of drive %s failed", drive)
+            sg.popup_error(f"La synchronisation a échoué : {e}\nAucun fichier ne sera supprimé de la source.",
+                           title="Erreur de synchronisation")
+            return
+        self._save_manifest(manifest_path, manifest)
+        logger.info("result = %s", result)
         reponse = sg.popup_ok_cancel(
             f"Transfert terminé ({len(result)} fichier(s) copié(s)).\n Voulez vous effacer la source?",
             title="Tranfert des fichiers.",
                  )
         if reponse == "OK":
-            logging.info("Supression des fichiers et dossiers source.")
+            logger.info("Supression des fichiers et dossiers source.")
             nb_files = self.del_tree(source)   
             sg.popup_ok(f"{nb_files} fichier(s) supprimé(s) de la source.",
                         title="Nettoyage de la source.")
 
-    def del_tree(self, p:Path, level=0)->int:
+    def _manifest_path(self, drive:Path, target:str)->Path:
+        '''
+        Chemin du manifest de synchronisation (à côté du fichier INI), propre au couple
+        lecteur + dossier cible : changer de dossier cible repart d'un manifest vierge
+        au lieu de sauter des fichiers jamais copiés vers la nouvelle cible.
+        '''
+        target_key = hashlib.md5(str(target).lower().encode()).hexdigest()[:8]
+        return self.ini_path.with_name(f".fusb_manifest_{str(drive)[0].lower()}_{target_key}.json")
+
+    def _load_manifest(self, manifest_path:Path)->dict:
+        '''
+        Charge le manifest {chemin relatif: [taille, mtime_ns]} de la dernière synchronisation.
+        '''
+        try:
+            return json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest_path:Path, manifest:dict):
+        '''
+        Enregistre le manifest de façon atomique (fichier temporaire + rename).
+        '''
+        tmp_path = manifest_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, manifest_path)
+
+    def _files_to_copy(self, source:str, target:str, manifest:dict=None)->list:
+        '''
+        Enumère les fichiers de source à copier vers target (répertoires cible créés au passage).
+         - Les fichiers listés dans le manifest avec la même signature (taille + mtime)
+           sont ignorés sans aucun stat sur la cible ;
+         - sinon les fichiers déjà présents et identiques sur la cible sont ignorés
+           (et inscrits au manifest : leur présence est vérifiée).
+        Renvoie une liste de tuples (source, destination, clé manifest, signature) ;
+        la signature d'un fichier à copier n'est inscrite au manifest par le copieur
+        qu'une fois sa copie réussie.
+        '''
+        to_copy = []
+        stack = [(source, target)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            os.makedirs(dst_dir, exist_ok=True)
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    dst = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, dst))
+                    else:
+                        st = entry.stat()
+                        signature = [st.st_size, st.st_mtime_ns]
+                        rel = None
+                        if manifest is not None:
+                            rel = os.path.relpath(entry.path, source)
+                            if manifest.get(rel) == signature:
+                                continue  # Déjà synchronisé lors d'une passe précédente
+                        try:
+                            dst_st = os.stat(dst)
+                        except OSError:
+                            dst_st = None
+                        if dst_st is None or (st.st_size, st.st_mtime_ns) != (dst_st.st_size, dst_st.st_mtime_ns):
+                            to_copy.append((entry.path, dst, rel, signature))
+                        elif manifest is not None:
+                            manifest[rel] = signature  # Déjà identique sur la cible
+        return to_copy
+
+    def _parallel_mirror(self, source:str, target:str, manifest:dict=None)->list:
+        '''
+        Copie récursivement source vers target avec un pool de threads.
+        Renvoie la liste des fichiers copiés.
+        '''
+        return self._pool_copy(self._files_to_copy(source, target, manifest), manifest)
+
+    def _pool_copy(self, to_copy:list, manifest:dict=None)->list:
+        '''
+        Copie les tuples (source, destination, clé manifest, signature) via un pool
+        de threads et renvoie la liste des fichiers copiés. Chaque signature n'est
+        inscrite au manifest qu'une fois sa copie réussie.
+        '''
+        copied = []
+        with ThreadPoolExecutor(max_workers=self.copy_workers) as pool:
+            futures = {pool.submit(_copy_file, src, dst): (dst, rel, signature)
+                       for src, dst, rel, signature in to_copy}
+            for future in as_completed(futures):
+                future.result()
+                dst, rel, signature = futures[future]
+                if manifest is not None and rel is not None:
+                    manifest[rel] = signature
+                copied.append(dst)
+        return copied
+
+    def _ioring_mirror(self, source:str, target:str, manifest:dict=None, qd:int=32)->list:
+        '''
+        Variante de _parallel_mirror qui soumet les lectures source par lots à un IoRing
+        (Windows 11 21H2+) : le noyau pipeline les requêtes USB sans un aller-retour
+        syscall par fichier. Les fichiers sont lus par tranches de ioring_chunk_size avec
+        au plus ioring_byte_budget octets en vol, jamais des fichiers entiers en mémoire ;
+        l'écriture locale (rapide) se fait au fil des complétions.
+        Retombe sur la copie par pool de threads si l'API est absente ou qu'une
+        soumission échoue ; les fichiers en échec y sont également repassés.
+        '''
+        if _ioring is None:
+            return self._parallel_mirror(source, target, manifest)
+        import msvcrt
+        to_copy = self._files_to_copy(source, target, manifest)
+        ring = ctypes.c_void_p()
+        if _ioring.CreateIoRing(3, _IORING_CREATE_FLAGS(0, 0), qd, 2 * qd, ctypes.byref(ring)) < 0:
+            return self._pool_copy(to_copy, manifest)
+        # Découpe chaque fichier en tranches (indice de fichier, offset, longueur)
+        jobs = []
+        remaining = {}  # Octets restant à compléter par fichier
+        for index, (src, dst, rel, signature) in enumerate(to_copy):
+            size = os.path.getsize(src)
+            remaining[index] = size
+            offset = 0
+            while True:
+                length = min(self.ioring_chunk_size, size - offset)
+                jobs.append((index, offset, length))
+                offset += length
+                if offset >= size:
+                    break
+        copied = []
+        failed = set()  # Indices de fichiers à repasser par _pool_copy
+        src_fds, dst_fds = {}, {}
+        job_pos = 0
+        try:
+            while job_pos < len(jobs):
+                # Lot borné en nombre d'opérations et en octets en vol
+                batch = []
+                in_flight = 0
+                while (job_pos < len(jobs) and len(batch) < qd
+                       and (not batch or in_flight + jobs[job_pos][2] <= self.ioring_byte_budget)):
+                    batch.append(jobs[job_pos])
+                    in_flight += jobs[job_pos][2]
+                    job_pos += 1
+                buffers = {}
+                built = 0
+                for slot, (index, offset, length) in enumerate(batch):
+                    if index in failed:
+                        continue
+                    src, dst = to_copy[index][:2]
+                    if index not in src_fds:
+                        src_fds[index] = os.open(src, os.O_RDONLY | os.O_BINARY)
+                        dst_fds[index] = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_BINARY)
+                    if length == 0:
+                        continue  # Fichier vide : créé par O_CREAT | O_TRUNC
+                    buf = ctypes.create_string_buffer(length)
+                    hr = _ioring.BuildIoRingReadFile(
+                        ring,
+                        _IORING_HANDLE_REF(0, msvcrt.get_osfhandle(src_fds[index])),
+                        _IORING_BUFFER_REF(0, ctypes.addressof(buf)),
+                        length, offset, slot, 0)
+                    if hr < 0:
+                        logger.warning("BuildIoRingReadFile failed for %s: HRESULT %#x", src, hr & 0xFFFFFFFF)
+                        failed.add(index)
+                        continue
+                    buffers[slot] = buf
+                    built += 1
+                submitted = ctypes.c_uint32(0)
+                if built:
+                    # N'attendre que les opérations réellement soumises : pas de blocage infini
+                    hr = _ioring.SubmitIoRing(ring, built, 0xFFFFFFFF, ctypes.byref(submitted))
+                    if hr < 0:
+                        # L'état de la file du ring est inconnu : des SQE restés en attente
+                        # seraient flushés au prochain submit vers des buffers libérés.
+                        # On abandonne le ring : tous les fichiers non finalisés passent par le pool.
+                        logger.warning("SubmitIoRing failed: HRESULT %#x", hr & 0xFFFFFFFF)
+                        failed.update(remaining.keys())
+                        break
+                    else:
+                        cqe = _IORING_CQE()
+                        while _ioring.PopIoRingCompletion(ring, ctypes.byref(cqe)) == 0:
+                            index, offset, length = batch[cqe.user_data]
+                            if cqe.result >= 0 and index not in failed:
+                                # lseek + write : os.pwrite n'existe pas sous Windows ;
+                                # seul le thread du miroir touche ces descripteurs
+                                os.lseek(dst_fds[index], offset, os.SEEK_SET)
+                                os.write(dst_fds[index], buffers[cqe.user_data].raw[:cqe.information])
+                            else:
+                                logger.warning("IoRing read failed for %s: HRESULT %#x",
+                                               to_copy[index][0], cqe.result & 0xFFFFFFFF)
+                                failed.add(index)
+                            remaining[index] -= length
+                # Finalise les fichiers dont toutes les tranches sont terminées
+                for index in {index for index, _, _ in batch}:
+                    if index in remaining and remaining[index] <= 0:
+                        del remaining[index]
+                        src, dst, rel, signature = to_copy[index]
+                        os.close(src_fds.pop(index))
+                        os.close(dst_fds.pop(index))
+                        if index not in failed:
+                            st = os.stat(src)
+                            os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+                            if manifest is not None and rel is not None:
+                                manifest[rel] = signature  # Copie réussie : signature inscrite
+                            copied.append(dst)
+        finally:
+            for fd in src_fds.values():
+                os.close(fd)
+            for fd in dst_fds.values():
+                os.close(fd)
+            _ioring.CloseIoRing(ring)
+        if failed:
+            copied += self._pool_copy([to_copy[index] for index in sorted(failed)], manifest)
+        return copied
+
+    def del_tree(self, p:str, level=0)->int:
         '''
         Vide un repertoire récursivement
         (sans supprimer le répertoir en lui même)
         renvoie le nombre de fichier supprimés
         '''
         nb_files = 0
-        for child in p.iterdir():
-            if child.is_file():
-                child.unlink()
-                nb_files+=1
-            else:
-                nb_files += self.del_tree(child, level+1)
+        with os.scandir(p) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):  # pas de stat : lit le type depuis le readdir
+                    os.unlink(entry.path)
+                    nb_files+=1
+                else:
+                    nb_files += self.del_tree(entry.path, level+1)
         if level>0:
-            p.rmdir()
+            os.rmdir(p)
         return nb_files
 
     def open_folder(self):
@@ -187,21 +568,22 @@ class FMassStorageSync:
             import os
             os.startfile(self.local_folder)
         else:
-            logging.warning("Local folder is not set. Cannot open folder.")
+            logger.warning("Local folder is not set. Cannot open folder.")
     
     def open_settings(self):
         '''
         Ouvre la fenêtre de paramètres (non implémentée).
         '''
-        logging.info("Open setting")
+        logger.info("Open setting")
         os.system(str(self.ini_path))  # Ouvre le fichier de configuration dans l'éditeur de texte par défaut
     
     def quit(self):
         '''
         Quitte l'application.
         '''
-        logging.info("Quitting FMassStorageSync.")
+        logger.info("Quitting FMassStorageSync.")
         self.fmount.stop()  # Arrête le scan des lecteurs montés
+        self._pool.shutdown(wait=False)
         self.icon.stop()
 
 if __name__ == "__main__":